@@ -6,7 +6,7 @@ from dataclasses import dataclass, field
 from typing import Any
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalItem:
     """统一检索结果条目。
 
@@ -37,7 +37,7 @@ class RetrievalItem:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResponse:
     """统一检索响应。
 
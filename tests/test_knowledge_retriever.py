@@ -6,6 +6,8 @@
 
 from __future__ import annotations
 
+import copy
+from typing import Any
 from unittest.mock import MagicMock
 
 import pytest
@@ -30,46 +32,102 @@ from knowledge_retriever.retriever import (
 from vector_store.retriever import RetrievalResult, VectorRetriever
 
 
+# ═══════════════════════════════════════════════════════════════
+# 默认 Mock 返回值（模块加载时构建一次，fixture 中按需复制）
+# ═══════════════════════════════════════════════════════════════
+
+_DEFAULT_VECTOR_RESULTS: tuple[RetrievalResult, ...] = (
+    RetrievalResult(
+        content="混凝土浇筑施工应分层进行",
+        score=0.92,
+        collection="ch06_methods",
+        file_id="doc01",
+        context=None,
+    ),
+    RetrievalResult(
+        content="项目经理负责全面管理",
+        score=0.75,
+        collection="templates",
+        file_id="doc03",
+        context=None,
+    ),
+)
+
+_DEFAULT_KG_REQ: ProcessRequirements = ProcessRequirements(
+    process_name="钢筋绑扎",
+    equipment=["塔吊"],
+    hazards=["高处坠落"],
+    safety_measures={"高处坠落": ["佩戴安全带"]},
+    quality_points=["钢筋间距检查"],
+)
+
+
 # ═══════════════════════════════════════════════════════════════
 # 测试 Fixture
 # ═══════════════════════════════════════════════════════════════
 
 
+class _StubVector:
+    """轻量 VectorRetriever 替身，不记录完整调用历史，只保留调用次数和最近一次参数。
+
+    供无需 assert_called_* 的测试使用，避免 MagicMock 的调用记录开销。
+    """
+
+    def __init__(self, results: tuple[RetrievalResult, ...]) -> None:
+        self._results = results
+        self.calls = 0
+        self.last_kwargs: dict[str, Any] = {}
+
+    def search(self, **kwargs: Any) -> list[RetrievalResult]:
+        """返回预置结果，并记录调用次数与本次调用参数。"""
+        self.calls += 1
+        self.last_kwargs = kwargs
+        return list(self._results)
+
+    def close(self) -> None:
+        """与 VectorRetriever 接口一致，无资源需释放。"""
+
+
+def _make_mock_vector() -> MagicMock:
+    """构建返回默认案例结果的 Mock VectorRetriever。"""
+    mock = MagicMock(spec=VectorRetriever)
+    mock.search.return_value = list(_DEFAULT_VECTOR_RESULTS)
+    return mock
+
+
+def _make_mock_kg() -> MagicMock:
+    """构建返回默认要求链的 Mock KGRetriever。"""
+    mock = MagicMock(spec=KGRetriever)
+    # 深拷贝：_process_requirements_to_items 会把列表直接放入 metadata
+    mock.infer_process_chain.return_value = copy.deepcopy(_DEFAULT_KG_REQ)
+    return mock
+
+
 @pytest.fixture
 def mock_vector() -> MagicMock:
     """Mock VectorRetriever。"""
-    mock = MagicMock(spec=VectorRetriever)
-    mock.search.return_value = [
-        RetrievalResult(
-            content="混凝土浇筑施工应分层进行",
-            score=0.92,
-            collection="ch06_methods",
-            file_id="doc01",
-            context=None,
-        ),
-        RetrievalResult(
-            content="项目经理负责全面管理",
-            score=0.75,
-            collection="templates",
-            file_id="doc03",
-            context=None,
-        ),
-    ]
-    return mock
+    return _make_mock_vector()
 
 
 @pytest.fixture
 def mock_kg() -> MagicMock:
     """Mock KGRetriever。"""
-    mock = MagicMock(spec=KGRetriever)
-    mock.infer_process_chain.return_value = ProcessRequirements(
-        process_name="钢筋绑扎",
-        equipment=["塔吊"],
-        hazards=["高处坠落"],
-        safety_measures={"高处坠落": ["佩戴安全带"]},
-        quality_points=["钢筋间距检查"],
+    return _make_mock_kg()
+
+
+@pytest.fixture
+def stub_vector() -> _StubVector:
+    """不记录调用历史的 VectorRetriever 替身。"""
+    return _StubVector(_DEFAULT_VECTOR_RESULTS)
+
+
+@pytest.fixture
+def retriever_fast(stub_vector: _StubVector, mock_kg: MagicMock) -> KnowledgeRetriever:
+    """向量引擎使用 _StubVector 的 KnowledgeRetriever（不检查向量调用记录的测试用）。"""
+    return KnowledgeRetriever(
+        vector_retriever=stub_vector,  # type: ignore[arg-type]
+        kg_retriever=mock_kg,
     )
-    return mock
 
 
 @pytest.fixture
@@ -99,6 +157,40 @@ def retriever_empty() -> KnowledgeRetriever:
     return KnowledgeRetriever()
 
 
+@pytest.fixture(scope="class")
+def dual_engine_response() -> tuple[RetrievalResponse, MagicMock, MagicMock]:
+    """KG 章节 + 工序输入的 retrieve() 结果，每个测试类只执行一次检索。
+
+    各测试只读取响应，不得修改。
+
+    Returns:
+        (响应, Mock VectorRetriever, Mock KGRetriever)
+    """
+    mock_vector = _make_mock_vector()
+    mock_kg = _make_mock_kg()
+    retriever = KnowledgeRetriever(
+        vector_retriever=mock_vector,
+        kg_retriever=mock_kg,
+    )
+    resp = retriever.retrieve(
+        query="钢筋绑扎质量控制",
+        chapter="ch07_quality",
+        engineering_type="变电土建",
+        processes=["钢筋绑扎"],
+    )
+    return resp, mock_vector, mock_kg
+
+
+@pytest.fixture(scope="class")
+def cases_items() -> list[RetrievalItem]:
+    """默认查询的 retrieve_cases() 结果，每个测试类只执行一次检索。
+
+    各测试只读取结果，不得修改。
+    """
+    retriever = KnowledgeRetriever(vector_retriever=_make_mock_vector())
+    return retriever.retrieve_cases(query="混凝土浇筑")
+
+
 # ═══════════════════════════════════════════════════════════════
 # config.py 测试
 # ═══════════════════════════════════════════════════════════════
@@ -397,15 +489,10 @@ class TestKnowledgeRetrieverRetrieve:
     """测试统一检索入口 retrieve()。"""
 
     def test_dual_engine_with_kg_chapter(
-        self, retriever: KnowledgeRetriever, mock_vector: MagicMock, mock_kg: MagicMock
+        self, dual_engine_response: tuple[RetrievalResponse, MagicMock, MagicMock]
     ) -> None:
         """KG 章节同时触发双引擎。"""
-        resp = retriever.retrieve(
-            query="钢筋绑扎质量控制",
-            chapter="ch07_quality",
-            engineering_type="变电土建",
-            processes=["钢筋绑扎"],
-        )
+        resp, mock_vector, mock_kg = dual_engine_response
         # KG 应被调用
         mock_kg.infer_process_chain.assert_called_once_with("钢筋绑扎")
         # 向量检索也应被调用
@@ -416,10 +503,10 @@ class TestKnowledgeRetrieverRetrieve:
         assert len(resp.cases) > 0
 
     def test_non_kg_chapter_skips_kg(
-        self, retriever: KnowledgeRetriever, mock_kg: MagicMock
+        self, retriever_fast: KnowledgeRetriever, mock_kg: MagicMock
     ) -> None:
         """非 KG 章节不触发 KG 推理。"""
-        resp = retriever.retrieve(
+        resp = retriever_fast.retrieve(
             query="施工方法",
             chapter="ch06_methods",
             processes=["钢筋绑扎"],
@@ -428,47 +515,41 @@ class TestKnowledgeRetrieverRetrieve:
         assert resp.regulations == []
 
     def test_none_chapter_triggers_kg(
-        self, retriever: KnowledgeRetriever, mock_kg: MagicMock
+        self, retriever_fast: KnowledgeRetriever, mock_kg: MagicMock
     ) -> None:
         """未指定章节时触发 KG。"""
-        retriever.retrieve(
+        retriever_fast.retrieve(
             query="通用查询",
             chapter=None,
             processes=["钢筋绑扎"],
         )
         mock_kg.infer_process_chain.assert_called()
 
-    def test_fusion_order(self, retriever: KnowledgeRetriever) -> None:
+    def test_fusion_order(
+        self, dual_engine_response: tuple[RetrievalResponse, MagicMock, MagicMock]
+    ) -> None:
         """融合结果按 priority ASC 排列。"""
-        resp = retriever.retrieve(
-            query="质量管理",
-            chapter="ch08_safety",
-            processes=["钢筋绑扎"],
-        )
+        resp = dual_engine_response[0]
         priorities = [i.priority for i in resp.items]
         assert priorities == sorted(priorities)
 
-    def test_query_context(self, retriever: KnowledgeRetriever) -> None:
+    def test_query_context(
+        self, dual_engine_response: tuple[RetrievalResponse, MagicMock, MagicMock]
+    ) -> None:
         """查询上下文正确记录。"""
-        resp = retriever.retrieve(
-            query="测试查询",
-            chapter="ch07_quality",
-            engineering_type="变电土建",
-            processes=["钢筋绑扎"],
-        )
-        ctx = resp.query_context
-        assert ctx["query"] == "测试查询"
+        ctx = dual_engine_response[0].query_context
+        assert ctx["query"] == "钢筋绑扎质量控制"
         assert ctx["chapter"] == "ch07_quality"
         assert ctx["engineering_type"] == "变电土建"
         assert ctx["processes"] == ["钢筋绑扎"]
 
-    def test_template_results_priority(self, retriever: KnowledgeRetriever) -> None:
+    def test_template_results_priority(
+        self, dual_engine_response: tuple[RetrievalResponse, MagicMock, MagicMock]
+    ) -> None:
         """templates collection 结果 priority 为 PRIORITY_TEMPLATE。"""
-        resp = retriever.retrieve(
-            query="组织机构",
-            chapter="ch06_methods",
-        )
+        resp = dual_engine_response[0]
         template_items = [i for i in resp.items if i.source == "template"]
+        assert len(template_items) == 1
         for item in template_items:
             assert item.priority == PRIORITY_TEMPLATE
 
@@ -485,14 +566,14 @@ class TestKnowledgeRetrieverRegulations:
         assert all(i.source == "kg_rule" for i in items)
         mock_kg.infer_process_chain.assert_called_once_with("钢筋绑扎")
 
-    def test_no_processes(self, retriever: KnowledgeRetriever) -> None:
+    def test_no_processes(self, retriever_fast: KnowledgeRetriever) -> None:
         """无工序时返回空。"""
-        items = retriever.retrieve_regulations(processes=None)
+        items = retriever_fast.retrieve_regulations(processes=None)
         assert items == []
 
-    def test_empty_processes(self, retriever: KnowledgeRetriever) -> None:
+    def test_empty_processes(self, retriever_fast: KnowledgeRetriever) -> None:
         """空工序列表返回空。"""
-        items = retriever.retrieve_regulations(processes=[])
+        items = retriever_fast.retrieve_regulations(processes=[])
         assert items == []
 
     def test_multiple_processes(
@@ -512,66 +593,61 @@ class TestKnowledgeRetrieverCases:
     """测试 retrieve_cases()。"""
 
     def test_basic_cases(
-        self, retriever: KnowledgeRetriever, mock_vector: MagicMock
+        self, retriever_fast: KnowledgeRetriever, stub_vector: _StubVector
     ) -> None:
         """基本案例检索。"""
-        items = retriever.retrieve_cases(query="混凝土浇筑")
+        items = retriever_fast.retrieve_cases(query="混凝土浇筑")
         assert len(items) == 2
-        mock_vector.search.assert_called_once_with(
-            query="混凝土浇筑",
-            collection=None,
-            engineering_type=None,
-            limit=DEFAULT_VECTOR_TOP_K,
-            threshold=DEFAULT_VECTOR_THRESHOLD,
-        )
-
-    def test_case_source_tagging(self, retriever: KnowledgeRetriever) -> None:
+        assert stub_vector.calls == 1
+        assert stub_vector.last_kwargs == {
+            "query": "混凝土浇筑",
+            "collection": None,
+            "engineering_type": None,
+            "limit": DEFAULT_VECTOR_TOP_K,
+            "threshold": DEFAULT_VECTOR_THRESHOLD,
+        }
+
+    def test_case_source_tagging(self, cases_items: list[RetrievalItem]) -> None:
         """非模板结果 source="vector"，模板结果 source="template"。"""
-        items = retriever.retrieve_cases(query="混凝土浇筑")
-        vector_items = [i for i in items if i.source == "vector"]
-        template_items = [i for i in items if i.source == "template"]
+        vector_items = [i for i in cases_items if i.source == "vector"]
+        template_items = [i for i in cases_items if i.source == "template"]
         assert len(vector_items) == 1
         assert len(template_items) == 1
 
-    def test_case_priority_tagging(self, retriever: KnowledgeRetriever) -> None:
+    def test_case_priority_tagging(self, cases_items: list[RetrievalItem]) -> None:
         """向量案例 priority=2，模板 priority=3。"""
-        items = retriever.retrieve_cases(query="混凝土浇筑")
-        for item in items:
+        for item in cases_items:
             if item.source == "vector":
                 assert item.priority == PRIORITY_VECTOR_CASE
             elif item.source == "template":
                 assert item.priority == PRIORITY_TEMPLATE
 
-    def test_case_metadata(self, retriever: KnowledgeRetriever) -> None:
+    def test_case_metadata(self, cases_items: list[RetrievalItem]) -> None:
         """元数据包含 collection 和 file_id。"""
-        items = retriever.retrieve_cases(query="混凝土浇筑")
-        for item in items:
+        for item in cases_items:
             assert "collection" in item.metadata
             assert "file_id" in item.metadata
 
     def test_with_chapter_filter(
-        self, retriever: KnowledgeRetriever, mock_vector: MagicMock
+        self, retriever_fast: KnowledgeRetriever, stub_vector: _StubVector
     ) -> None:
         """章节过滤透传给向量检索器。"""
-        retriever.retrieve_cases(query="安全措施", chapter="ch08_safety")
-        call_kwargs = mock_vector.search.call_args.kwargs
-        assert call_kwargs["collection"] == "ch08_safety"
+        retriever_fast.retrieve_cases(query="安全措施", chapter="ch08_safety")
+        assert stub_vector.last_kwargs["collection"] == "ch08_safety"
 
     def test_with_engineering_type(
-        self, retriever: KnowledgeRetriever, mock_vector: MagicMock
+        self, retriever_fast: KnowledgeRetriever, stub_vector: _StubVector
     ) -> None:
         """工程类型过滤透传。"""
-        retriever.retrieve_cases(query="混凝土", engineering_type="变电土建")
-        call_kwargs = mock_vector.search.call_args.kwargs
-        assert call_kwargs["engineering_type"] == "变电土建"
+        retriever_fast.retrieve_cases(query="混凝土", engineering_type="变电土建")
+        assert stub_vector.last_kwargs["engineering_type"] == "变电土建"
 
     def test_custom_limit(
-        self, retriever: KnowledgeRetriever, mock_vector: MagicMock
+        self, retriever_fast: KnowledgeRetriever, stub_vector: _StubVector
     ) -> None:
         """自定义 limit 透传。"""
-        retriever.retrieve_cases(query="测试", limit=5)
-        call_kwargs = mock_vector.search.call_args.kwargs
-        assert call_kwargs["limit"] == 5
+        retriever_fast.retrieve_cases(query="测试", limit=5)
+        assert stub_vector.last_kwargs["limit"] == 5
 
     def test_no_vector_engine(self, retriever_kg_only: KnowledgeRetriever) -> None:
         """无向量引擎时返回空。"""
@@ -590,14 +666,14 @@ class TestKnowledgeRetrieverInferRules:
         assert len(items) == 3
         mock_kg.infer_process_chain.assert_called_once_with("钢筋绑扎")
 
-    def test_no_processes(self, retriever: KnowledgeRetriever) -> None:
+    def test_no_processes(self, retriever_fast: KnowledgeRetriever) -> None:
         """无工序时返回空。"""
-        items = retriever.infer_rules(context="测试", processes=None)
+        items = retriever_fast.infer_rules(context="测试", processes=None)
         assert items == []
 
-    def test_empty_processes(self, retriever: KnowledgeRetriever) -> None:
+    def test_empty_processes(self, retriever_fast: KnowledgeRetriever) -> None:
         """空工序列表返回空。"""
-        items = retriever.infer_rules(context="测试", processes=[])
+        items = retriever_fast.infer_rules(context="测试", processes=[])
         assert items == []
 
     def test_no_kg_engine(self, retriever_vector_only: KnowledgeRetriever) -> None:
@@ -608,79 +684,58 @@ class TestKnowledgeRetrieverInferRules:
         assert items == []
 
 
-class TestKnowledgeRetrieverSingleEngine:
-    """测试单引擎模式。"""
-
-    def test_vector_only(
-        self, retriever_vector_only: KnowledgeRetriever, mock_vector: MagicMock
-    ) -> None:
-        """仅向量引擎：KG 相关章节也正常工作。"""
-        resp = retriever_vector_only.retrieve(
-            query="安全措施",
-            chapter="ch08_safety",
-            processes=["钢筋绑扎"],
-        )
-        # 无规范，有案例
-        assert resp.regulations == []
-        assert len(resp.cases) > 0
-        mock_vector.search.assert_called_once()
-
-    def test_kg_only(
-        self, retriever_kg_only: KnowledgeRetriever, mock_kg: MagicMock
-    ) -> None:
-        """仅 KG 引擎：无案例但有规范。"""
-        resp = retriever_kg_only.retrieve(
-            query="质量管理",
-            chapter="ch07_quality",
-            processes=["钢筋绑扎"],
-        )
-        assert len(resp.regulations) > 0
-        assert resp.cases == []
-        mock_kg.infer_process_chain.assert_called_once()
-
-    def test_no_engine(self, retriever_empty: KnowledgeRetriever) -> None:
-        """双引擎均不可用时返回空结果。"""
-        resp = retriever_empty.retrieve(
-            query="测试",
-            chapter="ch08_safety",
-            processes=["钢筋绑扎"],
+# (配置名, 是否有向量引擎, 是否有 KG 引擎, 向量结果为空, KG 结果为空,
+#  期望规范非空, 期望案例非空)
+_ENGINE_CONFIGS: list[tuple[str, bool, bool, bool, bool, bool, bool]] = [
+    ("dual", True, True, False, False, True, True),
+    ("vector_only", True, False, False, False, False, True),
+    ("kg_only", False, True, False, False, True, False),
+    ("empty", False, False, False, False, False, False),
+    ("kg_empty_result", True, True, False, True, False, True),
+    ("vector_empty_result", True, True, True, False, True, False),
+]
+
+
+@pytest.fixture(params=_ENGINE_CONFIGS, ids=[c[0] for c in _ENGINE_CONFIGS])
+def configured_retriever(
+    request: pytest.FixtureRequest,
+) -> tuple[KnowledgeRetriever, bool, bool]:
+    """按引擎组合与降级场景构建 KnowledgeRetriever。
+
+    Returns:
+        (检索器, 期望规范非空, 期望案例非空)
+    """
+    _, has_vector, has_kg, vector_empty, kg_empty, expect_regs, expect_cases = (
+        request.param
+    )
+    mock_vector = _make_mock_vector() if has_vector else None
+    mock_kg = _make_mock_kg() if has_kg else None
+    if vector_empty:
+        mock_vector.search.return_value = []
+    if kg_empty:
+        mock_kg.infer_process_chain.return_value = ProcessRequirements(
+            process_name="空工序"
         )
-        assert resp.items == []
-        assert resp.regulations == []
-        assert resp.cases == []
+    retriever = KnowledgeRetriever(vector_retriever=mock_vector, kg_retriever=mock_kg)
+    return retriever, expect_regs, expect_cases
 
 
-class TestKnowledgeRetrieverDegradation:
-    """测试降级行为。"""
+class TestKnowledgeRetrieverEngineConfiguration:
+    """测试单引擎模式与降级行为。"""
 
-    def test_kg_empty_result(
-        self, retriever: KnowledgeRetriever, mock_kg: MagicMock
+    def test_engine_configuration(
+        self, configured_retriever: tuple[KnowledgeRetriever, bool, bool]
     ) -> None:
-        """KG 返回空结果时仍有 vector 结果。"""
-        mock_kg.infer_process_chain.return_value = ProcessRequirements(
-            process_name="空工序"
-        )
+        """任一引擎缺失或返回空时，另一引擎结果不受影响。"""
+        retriever, expect_regs, expect_cases = configured_retriever
         resp = retriever.retrieve(
-            query="施工方法",
+            query="安全措施",
             chapter="ch08_safety",
-            processes=["空工序"],
-        )
-        # KG 无结果，但 vector 有
-        assert resp.regulations == []
-        assert len(resp.cases) > 0
-
-    def test_vector_empty_result(
-        self, retriever: KnowledgeRetriever, mock_vector: MagicMock
-    ) -> None:
-        """向量检索无结果时仍有 KG 结果。"""
-        mock_vector.search.return_value = []
-        resp = retriever.retrieve(
-            query="质量控制",
-            chapter="ch07_quality",
             processes=["钢筋绑扎"],
         )
-        assert len(resp.regulations) > 0
-        assert resp.cases == []
+        assert bool(resp.regulations) is expect_regs
+        assert bool(resp.cases) is expect_cases
+        assert len(resp.items) == len(resp.regulations) + len(resp.cases)
 
 
 class TestKnowledgeRetrieverClose:
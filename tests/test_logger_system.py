@@ -0,0 +1,70 @@
+"""utils/logger_system.py 单元测试 — 覆盖 log_json 的文件句柄缓存。"""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from utils import logger_system
+from utils.logger_system import log_json
+
+
+@pytest.fixture(autouse=True)
+def clean_log_handles() -> Iterator[None]:
+    """每个测试前后清空 log_json 句柄缓存，避免跨测试复用已删除的临时文件。"""
+    logger_system._close_log_handles()
+    yield
+    logger_system._close_log_handles()
+
+
+# ═══════════════════════════════════════════════════════════════
+# log_json()
+# ═══════════════════════════════════════════════════════════════
+
+
+class TestLogJson:
+    """log_json() 测试组。"""
+
+    def test_appends_utf8_lines_with_one_handle(self, tmp_path: Path) -> None:
+        """两次写入复用同一缓存句柄，追加两行 UTF-8 JSON。"""
+        path = str(tmp_path / "task_log.json")
+
+        log_json({"file": "一.pdf", "status": "success"}, filename=path)
+        handle = logger_system._LOG_HANDLES[path]
+        log_json({"file": "二.pdf", "status": "failed"}, filename=path)
+
+        assert logger_system._LOG_HANDLES[path] is handle
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["file"] for line in lines] == ["一.pdf", "二.pdf"]
+        assert all("timestamp" in json.loads(line) for line in lines)
+
+    def test_recreates_deleted_file(self, tmp_path: Path) -> None:
+        """日志文件被删除后，下一次写入重新创建文件而不是写进旧句柄。"""
+        path = tmp_path / "task_log.json"
+
+        log_json({"file": "a.pdf"}, filename=str(path))
+        path.unlink()
+        log_json({"file": "b.pdf"}, filename=str(path))
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["file"] for line in lines] == ["b.pdf"]
+
+    def test_follows_rotated_file(self, tmp_path: Path) -> None:
+        """日志文件被轮转（改名后新建同名文件）时写入新文件。"""
+        path = tmp_path / "task_log.json"
+        rotated = tmp_path / "task_log.json.1"
+
+        log_json({"file": "a.pdf"}, filename=str(path))
+        path.rename(rotated)
+        path.write_text("", encoding="utf-8")
+        log_json({"file": "b.pdf"}, filename=str(path))
+
+        assert [
+            json.loads(line)["file"]
+            for line in path.read_text(encoding="utf-8").splitlines()
+        ] == ["b.pdf"]
+        assert [
+            json.loads(line)["file"]
+            for line in rotated.read_text(encoding="utf-8").splitlines()
+        ] == ["a.pdf"]
@@ -5,25 +5,41 @@
 
 import json
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
+from qmd import Database, Store
+from qmd.llm.base import (
+    EmbeddingResult,
+    LLMBackend,
+    RerankDocument,
+    RerankResult,
+)
 
 from vector_store.config import (
     ALL_COLLECTIONS,
     CHAPTER_TO_COLLECTION,
+    EMBEDDING_DEVICE,
+    EMBEDDING_MODEL,
+    _read_batch_size,
 )
 from vector_store.indexer import (
     _build_document_content,
+    _create_embedding_backend,
+    _drop_partial_embeddings,
+    _embed_with_fallback,
     _index_extra_sources,
     _index_fragments,
-    _load_fragments,
+    _iter_fragments,
     build_vector_store,
 )
 from vector_store.retriever import (
+    _SHARED_BACKENDS,
     RetrievalResult,
     VectorRetriever,
     _match_engineering_type,
+    _QueryCachedBackend,
+    count_documents_by_collection,
 )
 
 
@@ -32,78 +48,112 @@ from vector_store.retriever import (
 # ═══════════════════════════════════════════════════════════════
 
 
-@pytest.fixture
+# 知识片段样本及其 JSONL 编码（模块导入时编码一次，fixture 只负责落盘）
+_SAMPLE_FRAGMENTS: list[dict] = [
+    {
+        "id": "doc01_ch6_s01",
+        "source_doc": 1,
+        "chapter": "六、施工方法及工艺要求",
+        "section": "6.1 混凝土浇筑",
+        "engineering_type": "变电土建",
+        "density": "high",
+        "tags": ["混凝土", "浇筑", "振捣"],
+        "content": "混凝土浇筑施工应分层进行，每层厚度不超过500mm。",
+    },
+    {
+        "id": "doc01_ch7_s01",
+        "chapter": "七、质量管理与控制措施",
+        "section": "7.1 质量控制",
+        "engineering_type": "变电土建",
+        "density": "high",
+        "tags": ["质量", "检查"],
+        "content": "每100m³取样一组标准养护试件。",
+    },
+    {
+        "id": "doc01_ch8_s01",
+        "chapter": "八、安全文明施工管理",
+        "section": "8.1 安全措施",
+        "engineering_type": "变电电气",
+        "density": "high",
+        "tags": ["安全", "高处"],
+        "content": "高处作业必须佩戴安全带。",
+    },
+    {
+        "id": "doc01_ch1_s01",
+        "chapter": "一、编制依据",
+        "section": "1.1 编制依据",
+        "engineering_type": "变电土建",
+        "density": "high",
+        "tags": ["标准", "规范"],
+        "content": "GB 50300-2013 建筑工程施工质量验收统一标准。",
+    },
+    {
+        "id": "doc01_ch5_s01",
+        "chapter": "五、施工准备",
+        "section": "5.1 设备",
+        "engineering_type": "变电土建",
+        "density": "medium",
+        "tags": ["设备", "准备"],
+        "content": "主要施工设备：塔吊1台，搅拌车2辆。",
+    },
+    {
+        "id": "doc01_ch3_s01",
+        "chapter": "三、施工组织机构及职责",
+        "section": "3.1 组织机构",
+        "engineering_type": "变电土建",
+        "density": "medium",
+        "tags": ["组织", "职责"],
+        "content": "项目经理负责全面管理，安全员负责安全监督。",
+    },
+]
+
+_SAMPLE_JSONL_TEXT: str = "".join(
+    json.dumps(frag, ensure_ascii=False) + "\n" for frag in _SAMPLE_FRAGMENTS
+)
+
+
+@pytest.fixture(scope="module")
 def sample_fragments() -> list[dict]:
-    """知识片段样本。"""
-    return [
-        {
-            "id": "doc01_ch6_s01",
-            "source_doc": 1,
-            "chapter": "六、施工方法及工艺要求",
-            "section": "6.1 混凝土浇筑",
-            "engineering_type": "变电土建",
-            "density": "high",
-            "tags": ["混凝土", "浇筑", "振捣"],
-            "content": "混凝土浇筑施工应分层进行，每层厚度不超过500mm。",
-        },
-        {
-            "id": "doc01_ch7_s01",
-            "chapter": "七、质量管理与控制措施",
-            "section": "7.1 质量控制",
-            "engineering_type": "变电土建",
-            "density": "high",
-            "tags": ["质量", "检查"],
-            "content": "每100m³取样一组标准养护试件。",
-        },
-        {
-            "id": "doc01_ch8_s01",
-            "chapter": "八、安全文明施工管理",
-            "section": "8.1 安全措施",
-            "engineering_type": "变电电气",
-            "density": "high",
-            "tags": ["安全", "高处"],
-            "content": "高处作业必须佩戴安全带。",
-        },
-        {
-            "id": "doc01_ch1_s01",
-            "chapter": "一、编制依据",
-            "section": "1.1 编制依据",
-            "engineering_type": "变电土建",
-            "density": "high",
-            "tags": ["标准", "规范"],
-            "content": "GB 50300-2013 建筑工程施工质量验收统一标准。",
-        },
-        {
-            "id": "doc01_ch5_s01",
-            "chapter": "五、施工准备",
-            "section": "5.1 设备",
-            "engineering_type": "变电土建",
-            "density": "medium",
-            "tags": ["设备", "准备"],
-            "content": "主要施工设备：塔吊1台，搅拌车2辆。",
-        },
-        {
-            "id": "doc01_ch3_s01",
-            "chapter": "三、施工组织机构及职责",
-            "section": "3.1 组织机构",
-            "engineering_type": "变电土建",
-            "density": "medium",
-            "tags": ["组织", "职责"],
-            "content": "项目经理负责全面管理，安全员负责安全监督。",
-        },
-    ]
-
-
-@pytest.fixture
-def fragments_jsonl(sample_fragments: list[dict], tmp_path: Path) -> Path:
-    """创建临时 fragments.jsonl 文件。"""
-    path = tmp_path / "fragments.jsonl"
-    with path.open("w", encoding="utf-8") as f:
-        for frag in sample_fragments:
-            f.write(json.dumps(frag, ensure_ascii=False) + "\n")
+    """知识片段样本（模块级常量，测试只读不得修改）。"""
+    return _SAMPLE_FRAGMENTS
+
+
+@pytest.fixture(scope="module")
+def fragments_jsonl(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """创建临时 fragments.jsonl 文件（模块内共享，只读）。"""
+    path = tmp_path_factory.mktemp("fragments") / "fragments.jsonl"
+    path.write_text(_SAMPLE_JSONL_TEXT, encoding="utf-8")
     return path
 
 
+@pytest.fixture(scope="module")
+def indexed_stats(
+    fragments_jsonl: Path, tmp_path_factory: pytest.TempPathFactory
+) -> dict[str, int]:
+    """对样本片段执行一次 _index_fragments，返回各 Collection 统计（模块内共享）。"""
+    import qmd
+
+    db_path = tmp_path_factory.mktemp("index_fragments") / "test.db"
+    db, store = qmd.create_store(str(db_path))
+    with patch("vector_store.indexer.FRAGMENTS_JSONL", fragments_jsonl):
+        return _index_fragments(store)
+
+
+@pytest.fixture(scope="module")
+def indexed_store(
+    fragments_jsonl: Path, tmp_path_factory: pytest.TempPathFactory
+) -> tuple[Database, Store]:
+    """构建一次无嵌入的向量库（模块内共享，测试只读不得写入）。"""
+    tmp_dir = tmp_path_factory.mktemp("indexed_store")
+    with patch.multiple(
+        "vector_store.indexer",
+        FRAGMENTS_JSONL=fragments_jsonl,
+        CH06_TEMPLATES_DIR=tmp_dir / "no1",
+        WRITING_GUIDES_DIR=tmp_dir / "no2",
+    ):
+        return build_vector_store(db_path=tmp_dir / "test.db", auto_embed=False)
+
+
 # ═══════════════════════════════════════════════════════════════
 # config.py 测试
 # ═══════════════════════════════════════════════════════════════
@@ -134,9 +184,28 @@ class TestConfig:
         assert CHAPTER_TO_COLLECTION["五、施工准备"] == "equipment"
         assert CHAPTER_TO_COLLECTION["三、施工组织机构及职责"] == "templates"
 
+    def test_batch_size_default(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """未设置环境变量时批大小为默认值。"""
+        monkeypatch.delenv("SCA_EMBEDDING_BATCH_SIZE", raising=False)
+        assert _read_batch_size() == 32
+
+    def test_batch_size_from_env(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """环境变量覆盖批大小。"""
+        monkeypatch.setenv("SCA_EMBEDDING_BATCH_SIZE", "128")
+        assert _read_batch_size() == 128
+
+    @pytest.mark.parametrize("raw", ["abc", "0", "-8", "1.5"])
+    def test_batch_size_invalid(
+        self, monkeypatch: pytest.MonkeyPatch, raw: str
+    ) -> None:
+        """非正整数取值给出明确的 ValueError。"""
+        monkeypatch.setenv("SCA_EMBEDDING_BATCH_SIZE", raw)
+        with pytest.raises(ValueError, match="SCA_EMBEDDING_BATCH_SIZE"):
+            _read_batch_size()
+
 
 # ═══════════════════════════════════════════════════════════════
-# indexer.py — _load_fragments 测试
+# indexer.py — _iter_fragments 测试
 # ═══════════════════════════════════════════════════════════════
 
 
@@ -145,20 +214,25 @@ class TestLoadFragments:
 
     def test_load_count(self, fragments_jsonl: Path) -> None:
         """加载正确数量的片段。"""
-        fragments = _load_fragments(fragments_jsonl)
+        fragments = list(_iter_fragments(fragments_jsonl))
         assert len(fragments) == 6
 
+    def test_iter_is_lazy(self, fragments_jsonl: Path) -> None:
+        """返回生成器，按需逐条产出。"""
+        it = _iter_fragments(fragments_jsonl)
+        assert next(it)["id"] == "doc01_ch6_s01"
+
     def test_load_content(self, fragments_jsonl: Path) -> None:
         """片段内容正确。"""
-        fragments = _load_fragments(fragments_jsonl)
+        fragments = list(_iter_fragments(fragments_jsonl))
         assert fragments[0]["id"] == "doc01_ch6_s01"
         assert "混凝土" in fragments[0]["content"]
 
     def test_load_empty_file(self, tmp_path: Path) -> None:
-        """空文件返回空列表。"""
+        """空文件不产出任何片段。"""
         path = tmp_path / "empty.jsonl"
         path.write_text("", encoding="utf-8")
-        assert _load_fragments(path) == []
+        assert list(_iter_fragments(path)) == []
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -223,36 +297,18 @@ class TestBuildDocumentContent:
 class TestIndexFragments:
     """测试片段索引。"""
 
-    def test_index_to_correct_collections(
-        self, sample_fragments: list[dict], fragments_jsonl: Path, tmp_path: Path
-    ) -> None:
+    def test_index_to_correct_collections(self, indexed_stats: dict[str, int]) -> None:
         """片段按章节分配到正确的 Collection。"""
-        import qmd
-
-        db_path = tmp_path / "test.db"
-        db, store = qmd.create_store(str(db_path))
-
-        with patch("vector_store.indexer.FRAGMENTS_JSONL", fragments_jsonl):
-            stats = _index_fragments(store)
-
-        assert stats["ch06_methods"] == 1
-        assert stats["ch07_quality"] == 1
-        assert stats["ch08_safety"] == 1
-        assert stats["ch01_basis"] == 1
-        assert stats["equipment"] == 1
-        assert stats["templates"] == 1
-
-    def test_total_indexed(self, fragments_jsonl: Path, tmp_path: Path) -> None:
+        assert indexed_stats["ch06_methods"] == 1
+        assert indexed_stats["ch07_quality"] == 1
+        assert indexed_stats["ch08_safety"] == 1
+        assert indexed_stats["ch01_basis"] == 1
+        assert indexed_stats["equipment"] == 1
+        assert indexed_stats["templates"] == 1
+
+    def test_total_indexed(self, indexed_stats: dict[str, int]) -> None:
         """所有片段均被索引。"""
-        import qmd
-
-        db_path = tmp_path / "test.db"
-        db, store = qmd.create_store(str(db_path))
-
-        with patch("vector_store.indexer.FRAGMENTS_JSONL", fragments_jsonl):
-            stats = _index_fragments(store)
-
-        assert sum(stats.values()) == 6
+        assert sum(indexed_stats.values()) == 6
 
     def test_skip_unknown_chapter(self, tmp_path: Path) -> None:
         """未知章节跳过。"""
@@ -270,6 +326,25 @@ class TestIndexFragments:
 
         assert sum(stats.values()) == 0
 
+    def test_reindex_reports_unchanged(
+        self, fragments_jsonl: Path, tmp_path: Path
+    ) -> None:
+        """重复索引相同内容时统计为未变化。"""
+        import qmd
+
+        db, store = qmd.create_store(str(tmp_path / "test.db"))
+
+        with (
+            patch("vector_store.indexer.FRAGMENTS_JSONL", fragments_jsonl),
+            patch("vector_store.indexer.log_msg") as mock_log,
+        ):
+            _index_fragments(store)
+            mock_log.reset_mock()
+            _index_fragments(store)
+
+        messages = [c.args[1] for c in mock_log.call_args_list]
+        assert any("新增 0, 更新 0, 未变化 6" in m for m in messages)
+
 
 # ═══════════════════════════════════════════════════════════════
 # indexer.py — _index_extra_sources 测试
@@ -361,6 +436,192 @@ class TestBuildVectorStore:
         total = sum(store.get_document_count(c) for c in ALL_COLLECTIONS)
         assert total == 6
 
+    def test_build_relaxes_synchronous(
+        self, indexed_store: tuple[Database, Store]
+    ) -> None:
+        """构建期间连接使用 synchronous=NORMAL（1），避免逐条提交 fsync。"""
+        db, _ = indexed_store
+        assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+
+class TestCreateEmbeddingBackend:
+    """测试嵌入后端把批大小透传给 encode。"""
+
+    def test_encode_uses_whole_batch(self) -> None:
+        """embed_batch 以本批 chunk 数作为 encode 的 batch_size。"""
+        sentence_tf = pytest.importorskip("qmd.llm.sentence_tf")
+        model = MagicMock()
+        model.encode.return_value = [
+            MagicMock(tolist=MagicMock(return_value=[0.1])) for _ in range(3)
+        ]
+
+        with (
+            patch.object(
+                sentence_tf.SentenceTransformerBackend,
+                "_get_model",
+                return_value=model,
+            ),
+            patch("vector_store.indexer.EMBEDDING_DEVICE", "cpu"),
+        ):
+            backend = _create_embedding_backend()
+            results = backend.embed_batch(["a", "b", "c"])
+
+        assert len(results) == 3
+        assert model.encode.call_args.kwargs["batch_size"] == 3
+
+
+class _FakeEmbeddingBackend(LLMBackend):
+    """确定性的 4 维嵌入后端：含 bad_marker 的批次整批失败（模拟 qmd 吞异常）。"""
+
+    def __init__(self, bad_marker: str | None = None) -> None:
+        self.bad_marker = bad_marker
+        self.embedded_texts: list[str] = []
+
+    def embed(
+        self, text: str, is_query: bool = False, title: str | None = None
+    ) -> EmbeddingResult | None:
+        """返回由文本长度决定的向量。"""
+        return EmbeddingResult(
+            embedding=[float(len(text)), 1.0, 0.0, 0.0], model="fake"
+        )
+
+    def embed_batch(
+        self, texts: list[str], titles: list[str | None] | None = None
+    ) -> list[EmbeddingResult | None]:
+        """批内含坏文本时整批返回 None，否则逐条编码并记录。"""
+        if self.bad_marker and any(self.bad_marker in t for t in texts):
+            return [None] * len(texts)
+        self.embedded_texts.extend(texts)
+        return [self.embed(t) for t in texts]
+
+    def rerank(
+        self, query: str, documents: list[RerankDocument], top_n: int | None = None
+    ) -> RerankResult:
+        """测试不使用。"""
+        raise NotImplementedError
+
+    def expand_query(self, query: str, context: str | None = None) -> list:
+        """测试不使用。"""
+        return []
+
+    def get_embedding_dimensions(self) -> int:
+        """固定 4 维。"""
+        return 4
+
+    def close(self) -> None:
+        """无资源需释放。"""
+
+
+def _vector_rows(db: Database) -> dict[str, str]:
+    """返回 content_vectors 中 hash_seq → embedded_at 映射。"""
+    rows = db.conn.execute(
+        "SELECT hash, seq, embedded_at FROM content_vectors"
+    ).fetchall()
+    return {f"{r[0]}_{r[1]}": r[2] for r in rows}
+
+
+class TestEmbedWithFallback:
+    """测试嵌入失败时的批大小减半重试。"""
+
+    def test_no_errors_single_call(self) -> None:
+        """无失败时只调用一次，保持初始批大小。"""
+        store = MagicMock()
+        store.embed_documents.return_value = {"embedded": 6, "errors": 0}
+
+        stats = _embed_with_fallback(store, MagicMock(), 32)
+
+        assert stats == {"embedded": 6, "errors": 0}
+        store.embed_documents.assert_called_once()
+
+    @patch("vector_store.indexer._drop_partial_embeddings", return_value=0)
+    @patch("vector_store.indexer.EMBEDDING_DEVICE", "cpu")
+    def test_halves_batch_on_errors(self, mock_drop: MagicMock) -> None:
+        """出现失败时减半批大小，以 force=False 只重试失败文档，直到成功。"""
+        store = MagicMock()
+        store.embed_documents.side_effect = [
+            {"embedded": 0, "errors": 6},
+            {"embedded": 2, "errors": 4},
+            {"embedded": 4, "errors": 0},
+        ]
+
+        stats = _embed_with_fallback(store, MagicMock(), 32)
+
+        assert stats == {"embedded": 6, "errors": 0}
+        calls = store.embed_documents.call_args_list
+        assert [c.kwargs["batch_size"] for c in calls] == [32, 16, 8]
+        assert [c.kwargs["force"] for c in calls] == [False, False, False]
+        assert mock_drop.call_count == 2
+
+    @patch("vector_store.indexer._drop_partial_embeddings", return_value=0)
+    @patch("vector_store.indexer.EMBEDDING_DEVICE", "cpu")
+    def test_stops_at_batch_size_one(self, mock_drop: MagicMock) -> None:
+        """持续失败时批大小降到 1 后停止重试。"""
+        store = MagicMock()
+        store.embed_documents.return_value = {"embedded": 0, "errors": 1}
+
+        stats = _embed_with_fallback(store, MagicMock(), 4)
+
+        assert stats["errors"] == 1
+        assert store.embed_documents.call_count == 3  # 4 → 2 → 1
+
+    @patch("vector_store.indexer.EMBEDDING_DEVICE", "cpu")
+    def test_failed_rerun_keeps_existing_embeddings(self, tmp_path: Path) -> None:
+        """增量重建中途失败时，已有嵌入保留，只重试失败的文档。"""
+        import qmd
+
+        db, store = qmd.create_store(str(tmp_path / "test.db"))
+        for i in range(4):
+            store.index_document("ch06_methods", f"old_{i}", f"已有片段 {i}")
+        first = _embed_with_fallback(store, _FakeEmbeddingBackend(), 4)
+        assert first == {"embedded": 4, "errors": 0}
+        before = _vector_rows(db)
+
+        # 第二次构建：新增 3 条，其中 1 条每次都失败
+        store.index_document("ch06_methods", "new_0", "新增片段 0")
+        store.index_document("ch06_methods", "new_bad", "新增片段 坏")
+        store.index_document("ch06_methods", "new_1", "新增片段 1")
+        backend = _FakeEmbeddingBackend(bad_marker="坏")
+        second = _embed_with_fallback(store, backend, 4)
+
+        after = _vector_rows(db)
+        # 已有嵌入未被清空或重算
+        assert {k: after[k] for k in before} == before
+        assert not any("已有片段" in t for t in backend.embedded_texts)
+        # 好的新文档在减小批大小后补齐，坏文档仍缺失
+        assert len(after) == len(before) + 2
+        assert second["embedded"] == 2
+        assert second["errors"] == 1
+
+    def test_drop_partial_embeddings(self, tmp_path: Path) -> None:
+        """只清理缺少部分 chunk 的文档向量，完整文档保留。"""
+        import qmd
+
+        db, store = qmd.create_store(str(tmp_path / "test.db"))
+        long_doc = "\n\n".join(f"第 {i} 段。" + "施工" * 400 for i in range(6))
+        store.index_document("ch06_methods", "long", long_doc)
+        store.index_document("ch06_methods", "short", "短片段")
+        _embed_with_fallback(store, _FakeEmbeddingBackend(), 32)
+        long_hash = db.conn.execute(
+            "SELECT hash FROM documents WHERE path LIKE '%long%'"
+        ).fetchone()[0]
+        seqs = db.conn.execute(
+            "SELECT seq FROM content_vectors WHERE hash = ?", (long_hash,)
+        ).fetchall()
+        assert len(seqs) > 1
+        # 模拟最后一个 chunk 嵌入失败
+        last = max(r[0] for r in seqs)
+        db.conn.execute(
+            "DELETE FROM content_vectors WHERE hash = ? AND seq = ?", (long_hash, last)
+        )
+        db.conn.execute(
+            "DELETE FROM vectors_vec WHERE hash_seq = ?", (f"{long_hash}_{last}",)
+        )
+
+        assert _drop_partial_embeddings(db) == 1
+        remaining = _vector_rows(db)
+        assert not any(k.startswith(long_hash) for k in remaining)
+        assert len(remaining) == 1
+
 
 # ═══════════════════════════════════════════════════════════════
 # retriever.py — _match_engineering_type 测试
@@ -428,18 +689,10 @@ class TestVectorRetriever:
 
     @pytest.fixture
     def retriever_with_data(
-        self, fragments_jsonl: Path, tmp_path: Path
+        self, indexed_store: tuple[Database, Store]
     ) -> VectorRetriever:
-        """创建已索引数据的检索器（无嵌入模型）。"""
-        db_path = tmp_path / "test_retriever.db"
-
-        with (
-            patch("vector_store.indexer.FRAGMENTS_JSONL", fragments_jsonl),
-            patch("vector_store.indexer.CH06_TEMPLATES_DIR", tmp_path / "no1"),
-            patch("vector_store.indexer.WRITING_GUIDES_DIR", tmp_path / "no2"),
-        ):
-            db, store = build_vector_store(db_path=db_path, auto_embed=False)
-
+        """包装共享向量库的检索器（无嵌入模型，每个测试独立实例）。"""
+        db, _ = indexed_store
         return VectorRetriever(db, backend=None)
 
     def test_get_collection_stats(self, retriever_with_data: VectorRetriever) -> None:
@@ -452,6 +705,25 @@ class TestVectorRetriever:
         assert stats["equipment"] == 1
         assert stats["templates"] == 1
 
+    def test_collection_stats_cover_all_collections(
+        self, retriever_with_data: VectorRetriever
+    ) -> None:
+        """统计覆盖全部 Collection，并与逐个 get_document_count 一致。"""
+        stats = retriever_with_data.get_collection_stats()
+        store = Store(retriever_with_data._db)
+        assert list(stats) == list(ALL_COLLECTIONS)
+        for coll in ALL_COLLECTIONS:
+            assert stats[coll] == store.get_document_count(coll)
+
+    def test_count_documents_by_collection(
+        self, indexed_store: tuple[Database, Store]
+    ) -> None:
+        """公开统计函数覆盖全部 Collection，总数与样本片段一致。"""
+        db, _ = indexed_store
+        counts = count_documents_by_collection(db)
+        assert list(counts) == list(ALL_COLLECTIONS)
+        assert sum(counts.values()) == 6
+
     def test_search_without_backend(self, retriever_with_data: VectorRetriever) -> None:
         """无嵌入模型时 BM25 检索仍可用。"""
         results = retriever_with_data.search(
@@ -508,3 +780,121 @@ class TestVectorRetriever:
         )
         assert "nonexistent" not in results
         assert "ch06_methods" in results
+
+
+class TestQueryCachedBackend:
+    """测试查询向量缓存包装。"""
+
+    def test_retriever_wraps_backend(self) -> None:
+        """传入后端时 VectorRetriever 自动包装缓存层。"""
+        retriever = VectorRetriever(MagicMock(), backend=MagicMock())
+        assert isinstance(retriever._backend, _QueryCachedBackend)
+
+    def test_repeated_query_embedded_once(self) -> None:
+        """同一查询文本只编码一次。"""
+        inner = MagicMock()
+        backend = _QueryCachedBackend(inner)
+
+        first = backend.embed("混凝土浇筑", is_query=True)
+        second = backend.embed("混凝土浇筑", is_query=True)
+
+        assert first is second
+        inner.embed.assert_called_once_with("混凝土浇筑", is_query=True)
+
+    def test_document_embed_not_cached(self) -> None:
+        """文档编码（is_query=False）不走缓存。"""
+        inner = MagicMock()
+        backend = _QueryCachedBackend(inner)
+
+        backend.embed("片段", is_query=False)
+        backend.embed("片段", is_query=False)
+
+        assert inner.embed.call_count == 2
+
+    def test_failed_embed_not_cached(self) -> None:
+        """编码失败返回 None 时不缓存，下次重试。"""
+        inner = MagicMock()
+        inner.embed.return_value = None
+        backend = _QueryCachedBackend(inner)
+
+        backend.embed("查询", is_query=True)
+        backend.embed("查询", is_query=True)
+
+        assert inner.embed.call_count == 2
+
+    @patch("vector_store.retriever.QUERY_EMBEDDING_CACHE_SIZE", 2)
+    def test_evicts_least_recently_used(self) -> None:
+        """超出容量时淘汰最久未用的查询。"""
+        inner = MagicMock()
+        backend = _QueryCachedBackend(inner)
+
+        backend.embed("a", is_query=True)
+        backend.embed("b", is_query=True)
+        backend.embed("a", is_query=True)  # a 变为最近使用
+        backend.embed("c", is_query=True)  # 淘汰 b
+
+        assert list(backend._query_cache) == ["a", "c"]
+
+    def test_close_delegates(self) -> None:
+        """关闭时清空缓存并释放内层后端。"""
+        inner = MagicMock()
+        backend = _QueryCachedBackend(inner)
+        backend.embed("查询", is_query=True)
+
+        backend.close()
+
+        assert not backend._query_cache
+        inner.close.assert_called_once()
+
+
+class TestSharedBackend:
+    """测试 from_storage 共享嵌入模型。"""
+
+    def test_from_storage_reuses_backend(self, tmp_path: Path) -> None:
+        """多次 from_storage 复用同一个模型后端。"""
+        shared = MagicMock()
+        with patch.dict(
+            "vector_store.retriever._SHARED_BACKENDS",
+            {(EMBEDDING_MODEL, EMBEDDING_DEVICE): shared},
+            clear=True,
+        ):
+            r1 = VectorRetriever.from_storage(db_path=tmp_path / "a.db")
+            r2 = VectorRetriever.from_storage(db_path=tmp_path / "b.db")
+
+        assert r1._backend._inner is shared
+        assert r2._backend._inner is shared
+
+    def test_close_keeps_shared_backend(self, tmp_path: Path) -> None:
+        """关闭检索器不关闭共享模型。"""
+        shared = MagicMock()
+        with patch.dict(
+            "vector_store.retriever._SHARED_BACKENDS",
+            {(EMBEDDING_MODEL, EMBEDDING_DEVICE): shared},
+            clear=True,
+        ):
+            retriever = VectorRetriever.from_storage(db_path=tmp_path / "a.db")
+            retriever.close()
+
+        assert retriever._backend is None
+        shared.close.assert_not_called()
+
+    def test_close_owned_backend(self) -> None:
+        """直接传入的后端由检索器负责关闭。"""
+        backend = MagicMock()
+        retriever = VectorRetriever(MagicMock(), backend=backend)
+
+        retriever.close()
+
+        backend.close.assert_called_once()
+
+    def test_reset_model_cache(self) -> None:
+        """reset_model_cache 关闭并清空共享模型。"""
+        shared = MagicMock()
+        with patch.dict(
+            "vector_store.retriever._SHARED_BACKENDS",
+            {(EMBEDDING_MODEL, EMBEDDING_DEVICE): shared},
+            clear=True,
+        ):
+            VectorRetriever.reset_model_cache()
+            assert _SHARED_BACKENDS == {}
+        shared.close.assert_called_once()
@@ -80,6 +80,12 @@ class TestCheckHallucination:
         v = MarkdownVerifier(forbidden_phrases=["自定义禁用词"])
         assert v.check_hallucination("这里提到自定义禁用词不在行首") is True
 
+    def test_multiple_forbidden_phrases(self) -> None:
+        """多个 forbidden_phrases 合并匹配，任一短语出现在行首都应被检测到。"""
+        v = MarkdownVerifier(forbidden_phrases=["禁用词甲", "禁用词(乙)"])
+        assert v.check_hallucination("## 标题\n  禁用词(乙)出现在行首") is False
+        assert v.check_hallucination("正文提到禁用词甲和禁用词(乙)") is True
+
 
 # ═══════════════════════════════════════════════════════════════
 # check_structure()
@@ -109,6 +115,11 @@ class TestCheckStructure:
         text = "| 列1 | 列2 | 列3 |"
         assert verifier.check_structure(text) is True
 
+    def test_broken_row_after_valid_table(self, verifier: MarkdownVerifier) -> None:
+        """合法表格之后的残缺行也应被定位并失败。"""
+        text = "| 项目 | 内容 |\n|---|---|\n| A | 1 |\n\n| 残缺行"
+        assert verifier.check_structure(text) is False
+
 
 # ═══════════════════════════════════════════════════════════════
 # verify() 集成测试
@@ -1,7 +1,9 @@
+import atexit
 import json
 import logging
 import os
 from datetime import datetime
+from typing import TextIO
 
 # 配置基础日志
 logging.basicConfig(
@@ -10,6 +12,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger("nanwang")
 
+# 日志级别名 -> logging 级别常量，未登记的级别按 INFO 输出并带上原级别名
+_LEVELS: dict[str, int] = {
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+# log_json 的文件句柄缓存：每个文件只打开一次，进程退出时统一关闭
+_LOG_HANDLES: dict[str, TextIO] = {}
+
 def log_msg(level: str, msg: str):
     """
     记录文本日志。如果级别为 ERROR，则抛出异常。
@@ -19,19 +31,19 @@ def log_msg(level: str, msg: str):
         msg: 日志内容
     """
     level = level.upper()
-    if level == "INFO":
-        logger.info(msg)
-    elif level == "WARNING":
-        logger.warning(msg)
-    elif level == "ERROR":
-        logger.error(msg)
-        raise Exception(msg)
-    else:
+    levelno = _LEVELS.get(level)
+    if levelno is None:
         logger.info(f"[{level}] {msg}")
+        return
+    logger.log(levelno, msg)
+    if levelno == logging.ERROR:
+        raise Exception(msg)
 
 def log_json(data: dict, filename: str = "task_log.json"):
     """
     将结构化数据记录到 JSON 文件中。
+
+    文件句柄按文件名缓存复用，文件被删除或轮转后会自动重新创建。
     
     Args:
         data: 要记录的字典数据
@@ -42,7 +54,54 @@ def log_json(data: dict, filename: str = "task_log.json"):
         **data
     }
     
-    # 简单的追加逻辑
-    mode = 'a' if os.path.exists(filename) else 'w'
-    with open(filename, mode, encoding='utf-8') as f:
-        f.write(json.dumps(data_with_time, ensure_ascii=False) + "\n")
+    f = _get_log_handle(filename)
+    f.write(json.dumps(data_with_time, ensure_ascii=False) + "\n")
+    f.flush()
+
+def _get_log_handle(filename: str) -> TextIO:
+    """
+    获取日志文件的追加句柄，首次调用时打开并缓存。
+
+    若文件已被删除或轮转（路径上不存在或已换成新文件），关闭旧句柄并重新打开，
+    保证记录写入当前路径下的文件，而不是写进已解除链接的旧文件。
+
+    Args:
+        filename: JSON 日志文件名
+
+    Returns:
+        以追加模式打开的文件句柄
+    """
+    handle = _LOG_HANDLES.get(filename)
+    if handle is not None and not _is_same_file(handle, filename):
+        handle.close()
+        handle = None
+    if handle is None:
+        # 句柄需跨调用复用，由 _close_log_handles 在进程退出时关闭
+        handle = open(filename, 'a', encoding='utf-8')  # noqa: SIM115
+        _LOG_HANDLES[filename] = handle
+    return handle
+
+def _is_same_file(handle: TextIO, filename: str) -> bool:
+    """
+    判断缓存句柄是否仍指向路径上的当前文件。
+
+    Args:
+        handle: 已缓存的文件句柄
+        filename: JSON 日志文件名
+
+    Returns:
+        路径存在且与句柄为同一文件时返回 True
+    """
+    try:
+        path_stat = os.stat(filename)
+    except FileNotFoundError:
+        return False
+    handle_stat = os.fstat(handle.fileno())
+    return os.path.samestat(path_stat, handle_stat)
+
+@atexit.register
+def _close_log_handles() -> None:
+    """进程退出时关闭所有缓存的日志文件句柄。"""
+    for handle in _LOG_HANDLES.values():
+        handle.close()
+    _LOG_HANDLES.clear()
@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import os
+from collections.abc import Mapping
 from pathlib import Path
+from types import MappingProxyType
 
 # ---------------------------------------------------------------------------
 # 路径
@@ -22,7 +25,7 @@ DB_PATH = VECTOR_STORE_DIR / "qmd.db"
 # ---------------------------------------------------------------------------
 # Chapter → Collection 映射
 # ---------------------------------------------------------------------------
-CHAPTER_TO_COLLECTION: dict[str, str] = {
+_CHAPTER_TO_COLLECTION_RAW: dict[str, str] = {
     "一、编制依据": "ch01_basis",
     "六、施工方法及工艺要求": "ch06_methods",
     "七、质量管理与控制措施": "ch07_quality",
@@ -34,9 +37,11 @@ CHAPTER_TO_COLLECTION: dict[str, str] = {
     "三、施工组织机构及职责": "templates",
     "四、施工安排与进度计划": "templates",
 }
+# 只读视图，防止运行时误改映射
+CHAPTER_TO_COLLECTION: Mapping[str, str] = MappingProxyType(_CHAPTER_TO_COLLECTION_RAW)
 
-# 所有 Collection 名称
-ALL_COLLECTIONS: list[str] = [
+# 所有 Collection 名称（有序，只读）
+ALL_COLLECTIONS: tuple[str, ...] = (
     "ch01_basis",
     "ch06_methods",
     "ch07_quality",
@@ -45,7 +50,9 @@ ALL_COLLECTIONS: list[str] = [
     "ch10_green",
     "equipment",
     "templates",
-]
+)
+# Collection 名称集合，用于 O(1) 合法性校验
+ALL_COLLECTIONS_SET: frozenset[str] = frozenset(ALL_COLLECTIONS)
 
 # ---------------------------------------------------------------------------
 # 嵌入模型（K20 评测选定）
@@ -53,10 +60,40 @@ ALL_COLLECTIONS: list[str] = [
 EMBEDDING_MODEL: str = "Qwen/Qwen3-Embedding-0.6B"
 EMBEDDING_DIM: int = 1024
 EMBEDDING_DEVICE: str = "cuda"
-EMBEDDING_BATCH_SIZE: int = 32
+
+
+def _read_batch_size(default: int = 32) -> int:
+    """读取环境变量 SCA_EMBEDDING_BATCH_SIZE 并校验为正整数。
+
+    Args:
+        default: 未设置时的默认值
+
+    Returns:
+        嵌入批大小
+
+    Raises:
+        ValueError: 取值不是正整数
+    """
+    raw = os.environ.get("SCA_EMBEDDING_BATCH_SIZE", str(default))
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(
+            f"SCA_EMBEDDING_BATCH_SIZE 必须是正整数，当前为 {raw!r}"
+        ) from None
+    if value < 1:
+        raise ValueError(f"SCA_EMBEDDING_BATCH_SIZE 必须是正整数，当前为 {value}")
+    return value
+
+
+# 嵌入批大小：qmd 每次送入后端的 chunk 数，同时也是 GPU 上 encode 的批大小
+# （见 indexer._create_embedding_backend），显存充足时可调大到 64/128
+EMBEDDING_BATCH_SIZE: int = _read_batch_size()
 
 # ---------------------------------------------------------------------------
 # 检索参数
 # ---------------------------------------------------------------------------
 DEFAULT_TOP_K: int = 3
 DEFAULT_THRESHOLD: float = 0.6
+# 查询向量 LRU 缓存容量（同一查询跨多个 Collection 检索时只编码一次）
+QUERY_EMBEDDING_CACHE_SIZE: int = 256
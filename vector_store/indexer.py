@@ -9,12 +9,15 @@
 from __future__ import annotations
 
 import json
+from collections import Counter
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
 import qmd
 from qmd import Database, Store
-from qmd.llm.base import LLMBackend
+from qmd.core.chunking import chunk_document
+from qmd.llm.base import EmbeddingResult, LLMBackend
 
 from vector_store.config import (
     ALL_COLLECTIONS,
@@ -28,6 +31,7 @@ from vector_store.config import (
     WRITING_GUIDES_DIR,
 )
 from utils.logger_system import log_msg
+from vector_store.retriever import count_documents_by_collection
 
 
 # ---------------------------------------------------------------------------
@@ -68,6 +72,9 @@ def build_vector_store(
     # Step 1: 创建 store
     log_msg("INFO", "[Step 1/4] 创建 qmd store")
     db, store = qmd.create_store(str(db_path))
+    # qmd 每条 index_document 都单独 commit；WAL 模式下 NORMAL 不会损坏数据库，
+    # 只省去每次提交的 fsync，构建中断时重新构建即可
+    db.conn.execute("PRAGMA synchronous=NORMAL")
 
     # Step 2: 索引知识片段
     log_msg("INFO", "[Step 2/4] 索引知识片段")
@@ -81,9 +88,7 @@ def build_vector_store(
     if auto_embed:
         log_msg("INFO", "[Step 4/4] 生成嵌入向量")
         backend = _create_embedding_backend()
-        embed_stats = store.embed_documents(
-            backend, force=False, batch_size=EMBEDDING_BATCH_SIZE
-        )
+        embed_stats = _embed_with_fallback(store, backend, EMBEDDING_BATCH_SIZE)
         log_msg("INFO", f"  嵌入统计: {embed_stats}")
         backend.close()
     else:
@@ -92,8 +97,7 @@ def build_vector_store(
     # 统计
     log_msg("INFO", "=" * 60)
     total = 0
-    for coll in ALL_COLLECTIONS:
-        count = store.get_document_count(coll)
+    for coll, count in count_documents_by_collection(db).items():
         total += count
         log_msg("INFO", f"  {coll}: {count} 文档")
     log_msg("INFO", f"K23 构建完成: {total} 文档, 数据库 {db_path}")
@@ -107,22 +111,20 @@ def build_vector_store(
 # ---------------------------------------------------------------------------
 
 
-def _load_fragments(path: Path) -> list[dict[str, Any]]:
-    """加载 fragments.jsonl。
+def _iter_fragments(path: Path) -> Iterator[dict[str, Any]]:
+    """逐行流式读取 fragments.jsonl，避免一次性缓存全部片段。
 
     Args:
         path: JSONL 文件路径
 
-    Returns:
-        片段字典列表
+    Yields:
+        片段字典
     """
-    fragments: list[dict[str, Any]] = []
     with path.open("r", encoding="utf-8") as f:
         for line in f:
             line = line.strip()
             if line:
-                fragments.append(json.loads(line))
-    return fragments
+                yield json.loads(line)
 
 
 def _build_document_content(fragment: dict[str, Any]) -> str:
@@ -169,13 +171,14 @@ def _index_fragments(store: Store) -> dict[str, int]:
     Returns:
         各 Collection 索引数量统计
     """
-    fragments = _load_fragments(FRAGMENTS_JSONL)
-    log_msg("INFO", f"  加载 {len(fragments)} 条片段")
-
     stats: dict[str, int] = {coll: 0 for coll in ALL_COLLECTIONS}
+    # qmd 按内容哈希判定新增/更新/未变化，未变化的片段不会重复嵌入
+    statuses: Counter[str] = Counter()
+    loaded = 0
     skipped = 0
 
-    for frag in fragments:
+    for frag in _iter_fragments(FRAGMENTS_JSONL):
+        loaded += 1
         chapter = frag.get("chapter", "")
         collection = CHAPTER_TO_COLLECTION.get(chapter)
         if not collection:
@@ -185,10 +188,18 @@ def _index_fragments(store: Store) -> dict[str, int]:
         frag_id = frag.get("id", f"unknown_{skipped}")
         content = _build_document_content(frag)
 
-        store.index_document(collection, frag_id, content)
+        result = store.index_document(collection, frag_id, content)
+        statuses[result.get("status", "")] += 1
         stats[collection] = stats.get(collection, 0) + 1
 
+    log_msg("INFO", f"  加载 {loaded} 条片段")
     log_msg("INFO", f"  索引完成: {sum(stats.values())} 条, 跳过 {skipped}")
+    log_msg(
+        "INFO",
+        f"    新增 {statuses['indexed']}, "
+        f"更新 {statuses['updated'] + statuses['title_updated']}, "
+        f"未变化 {statuses['unchanged']}",
+    )
     for coll, count in sorted(stats.items()):
         if count > 0:
             log_msg("INFO", f"    {coll}: {count}")
@@ -234,19 +245,130 @@ def _index_extra_sources(store: Store) -> dict[str, int]:
     return stats
 
 
+def _embed_with_fallback(
+    store: Store, backend: LLMBackend, batch_size: int
+) -> dict[str, int]:
+    """生成嵌入向量，批次失败（通常为显存不足）时减半批大小，只重试失败的文档。
+
+    qmd 会吞掉批量嵌入异常并计入 errors，且只为完全没有向量的内容哈希补嵌入。
+    每次重试前先清掉部分 chunk 失败的文档的残留向量，再以 force=False 重跑，
+    已完整嵌入的文档不受影响（force=True 会清空整个向量表，不可用于重试）。
+
+    Args:
+        store: qmd Store 实例
+        backend: 嵌入模型后端
+        batch_size: 初始批大小
+
+    Returns:
+        嵌入统计：embedded 为各轮累计成功数，errors 为最后一轮失败数
+    """
+    stats = store.embed_documents(backend, force=False, batch_size=batch_size)
+    embedded = stats.get("embedded", 0)
+    retries = 0
+    while stats.get("errors", 0) and batch_size > 1:
+        batch_size //= 2
+        retries += 1
+        dropped = _drop_partial_embeddings(store.db)
+        log_msg(
+            "WARNING",
+            f"  {stats['errors']} 个 chunk 嵌入失败（清理 {dropped} 个不完整文档），"
+            f"批大小减半为 {batch_size} 后重试失败文档",
+        )
+        _release_device_cache()
+        stats = store.embed_documents(backend, force=False, batch_size=batch_size)
+        embedded += stats.get("embedded", 0)
+    log_msg("INFO", f"  嵌入批大小: {batch_size}, 重试 {retries} 次")
+    return {"embedded": embedded, "errors": stats.get("errors", 0)}
+
+
+def _drop_partial_embeddings(db: Database) -> int:
+    """删除只有部分 chunk 成功嵌入的内容哈希的向量，使其在下次嵌入时整体重做。
+
+    qmd 以"该哈希是否已有任一向量"判断是否需要嵌入，部分成功的多 chunk 文档
+    不会被自动补齐；按 qmd 的分块规则重新计算应有 chunk 数来识别这些文档。
+
+    Args:
+        db: qmd Database 实例
+
+    Returns:
+        被清理的内容哈希数量
+    """
+    rows = db.conn.execute(
+        """
+        SELECT c.hash, c.doc, COUNT(cv.seq)
+        FROM content c
+        JOIN content_vectors cv ON cv.hash = c.hash
+        WHERE c.hash IN (SELECT hash FROM documents WHERE active = 1)
+        GROUP BY c.hash
+        """
+    ).fetchall()
+    partial = [row[0] for row in rows if row[2] < len(chunk_document(row[1]))]
+    for content_hash in partial:
+        seqs = db.conn.execute(
+            "SELECT seq FROM content_vectors WHERE hash = ?", (content_hash,)
+        ).fetchall()
+        for (seq,) in seqs:
+            db.conn.execute(
+                "DELETE FROM vectors_vec WHERE hash_seq = ?", (f"{content_hash}_{seq}",)
+            )
+        db.conn.execute("DELETE FROM content_vectors WHERE hash = ?", (content_hash,))
+    db.conn.commit()
+    return len(partial)
+
+
+def _release_device_cache() -> None:
+    """释放 CUDA 缓存显存，供减小批大小后的重试使用。"""
+    if not EMBEDDING_DEVICE.startswith("cuda"):
+        return
+    import torch
+
+    torch.cuda.empty_cache()
+
+
 def _create_embedding_backend() -> LLMBackend:
     """创建嵌入模型后端。
 
+    qmd 的 SentenceTransformerBackend.embed_batch 调用 encode 时不传 batch_size，
+    GPU 批大小固定为 sentence-transformers 默认的 32。这里子类化后端，让每次
+    embed_batch 收到的整批 chunk 作为一个 GPU 批编码，使 GPU 批大小跟随
+    embed_documents 的 batch_size（EMBEDDING_BATCH_SIZE 及失败重试时的减半值）。
+
     Returns:
         SentenceTransformerBackend 实例
     """
     from qmd.llm.sentence_tf import SentenceTransformerBackend
 
+    class _BatchedSentenceTransformerBackend(SentenceTransformerBackend):
+        """按调用方批大小编码的 SentenceTransformerBackend。"""
+
+        def embed_batch(
+            self, texts: list[str], titles: list[str | None] | None = None
+        ) -> list[EmbeddingResult | None]:
+            """批量生成向量，GPU 批大小取本批 chunk 数；失败时整批返回 None。"""
+            if not texts:
+                return []
+            try:
+                embeddings = self._get_model().encode(
+                    texts,
+                    batch_size=len(texts),
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                )
+            except Exception as e:  # noqa: BLE001
+                # 与 qmd 原实现一致：任何异常（含显存不足）都整批返回 None，
+                # 由 embed_documents 计入 errors，交给 _embed_with_fallback 重试
+                log_msg("WARNING", f"  批量嵌入失败（{len(texts)} 条）: {e}")
+                return [None] * len(texts)
+            return [
+                EmbeddingResult(embedding=vec.tolist(), model=self.model_name)
+                for vec in embeddings
+            ]
+
     log_msg("INFO", f"  加载嵌入模型: {EMBEDDING_MODEL} (device={EMBEDDING_DEVICE})")
-    backend = SentenceTransformerBackend(
+    backend = _BatchedSentenceTransformerBackend(
         model_name=EMBEDDING_MODEL,
         device=EMBEDDING_DEVICE,
     )
     dim = backend.get_embedding_dimensions()
-    log_msg("INFO", f"  嵌入维度: {dim}")
+    log_msg("INFO", f"  嵌入维度: {dim}, GPU 批大小: {EMBEDDING_BATCH_SIZE}")
     return backend
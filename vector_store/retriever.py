@@ -5,21 +5,30 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import qmd
-from qmd import Database, Store
-from qmd.llm.base import LLMBackend
+from qmd import Database
+from qmd.llm.base import (
+    EmbeddingResult,
+    ExpandedQuery,
+    LLMBackend,
+    RerankDocument,
+    RerankResult,
+)
 
 from vector_store.config import (
     ALL_COLLECTIONS,
+    ALL_COLLECTIONS_SET,
     DB_PATH,
     DEFAULT_THRESHOLD,
     DEFAULT_TOP_K,
     EMBEDDING_DEVICE,
     EMBEDDING_MODEL,
+    QUERY_EMBEDDING_CACHE_SIZE,
 )
 
 
@@ -28,7 +37,7 @@ from vector_store.config import (
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalResult:
     """语义检索结果。"""
 
@@ -62,11 +71,19 @@ class VectorRetriever:
     Args:
         db: qmd Database 实例
         backend: LLM 后端（用于向量检索和 rerank）
+        owns_backend: close() 时是否关闭 backend（共享模型传 False）
     """
 
-    def __init__(self, db: Database, backend: LLMBackend | None = None) -> None:
+    def __init__(
+        self,
+        db: Database,
+        backend: LLMBackend | None = None,
+        *,
+        owns_backend: bool = True,
+    ) -> None:
         self._db = db
-        self._backend = backend
+        self._backend = _QueryCachedBackend(backend) if backend else None
+        self._owns_backend = owns_backend
 
     @classmethod
     def from_storage(
@@ -76,6 +93,8 @@ class VectorRetriever:
     ) -> "VectorRetriever":
         """从已有向量库加载。
 
+        嵌入模型在进程内按 (模型, 设备) 共享，多次加载只读取一次权重。
+
         Args:
             db_path: 数据库路径
             load_model: 是否加载嵌入模型（用于向量检索）
@@ -89,14 +108,16 @@ class VectorRetriever:
 
         backend = None
         if load_model:
-            from qmd.llm.sentence_tf import SentenceTransformerBackend
+            backend = _get_shared_backend(EMBEDDING_MODEL, EMBEDDING_DEVICE)
 
-            backend = SentenceTransformerBackend(
-                model_name=EMBEDDING_MODEL,
-                device=EMBEDDING_DEVICE,
-            )
+        return cls(db, backend, owns_backend=False)
 
-        return cls(db, backend)
+    @classmethod
+    def reset_model_cache(cls) -> None:
+        """关闭并清空进程内共享的嵌入模型。"""
+        for backend in _SHARED_BACKENDS.values():
+            backend.close()
+        _SHARED_BACKENDS.clear()
 
     def search(
         self,
@@ -181,7 +202,7 @@ class VectorRetriever:
         """
         results: dict[str, list[RetrievalResult]] = {}
         for coll in collections:
-            if coll not in ALL_COLLECTIONS:
+            if coll not in ALL_COLLECTIONS_SET:
                 continue
             coll_results = self.search(
                 query,
@@ -199,24 +220,136 @@ class VectorRetriever:
         Returns:
             Collection → 文档数量映射
         """
-        store = Store(self._db)
-        stats: dict[str, int] = {}
-        for coll in ALL_COLLECTIONS:
-            stats[coll] = store.get_document_count(coll)
-        return stats
+        return count_documents_by_collection(self._db)
 
     def close(self) -> None:
-        """释放资源。"""
+        """释放资源（共享的嵌入模型保留，由 reset_model_cache 统一关闭）。"""
         if self._backend:
-            self._backend.close()
+            if self._owns_backend:
+                self._backend.close()
             self._backend = None
 
 
+# ---------------------------------------------------------------------------
+# 统计
+# ---------------------------------------------------------------------------
+
+
+def count_documents_by_collection(db: Database) -> dict[str, int]:
+    """一次 GROUP BY 查询统计各 Collection 的活跃文档数量。
+
+    与 Store.get_document_count 口径一致（active = 1），但避免逐个 Collection 查询。
+
+    Args:
+        db: qmd Database 实例
+
+    Returns:
+        Collection → 文档数量映射（覆盖 ALL_COLLECTIONS，无文档为 0）
+    """
+    rows = db.conn.execute(
+        "SELECT collection, COUNT(*) FROM documents WHERE active = 1 GROUP BY collection"
+    ).fetchall()
+    counts = {row[0]: row[1] for row in rows}
+    return {coll: counts.get(coll, 0) for coll in ALL_COLLECTIONS}
+
+
 # ---------------------------------------------------------------------------
 # 内部方法
 # ---------------------------------------------------------------------------
 
 
+# from_storage 共享的嵌入模型：(模型名, 设备) → 后端，避免重复加载权重
+_SHARED_BACKENDS: dict[tuple[str, str], LLMBackend] = {}
+
+
+def _get_shared_backend(model_name: str, device: str) -> LLMBackend:
+    """获取共享的嵌入模型后端，首次调用时加载并缓存。
+
+    Args:
+        model_name: 嵌入模型名称
+        device: 运行设备
+
+    Returns:
+        SentenceTransformerBackend 实例
+    """
+    key = (model_name, device)
+    backend = _SHARED_BACKENDS.get(key)
+    if backend is None:
+        from qmd.llm.sentence_tf import SentenceTransformerBackend
+
+        backend = SentenceTransformerBackend(model_name=model_name, device=device)
+        _SHARED_BACKENDS[key] = backend
+    return backend
+
+
+class _QueryCachedBackend(LLMBackend):
+    """为查询向量加 LRU 缓存的后端包装。
+
+    qmd.search 每次调用都会对查询文本做一次 embed，search_multi_collection
+    对同一查询遍历多个 Collection 时会重复编码。这里只缓存 is_query=True
+    的单条编码（按查询文本），文档编码与 rerank 等调用原样转发。
+
+    Args:
+        inner: 实际的嵌入模型后端
+    """
+
+    def __init__(self, inner: LLMBackend) -> None:
+        self._inner = inner
+        self._query_cache: OrderedDict[str, EmbeddingResult] = OrderedDict()
+
+    def embed(
+        self, text: str, is_query: bool = False, title: str | None = None
+    ) -> EmbeddingResult | None:
+        """生成向量；查询编码按查询文本缓存。
+
+        仅 is_query=True 且无 title 的调用走缓存，键为查询文本；命中时移到队尾，
+        超出 QUERY_EMBEDDING_CACHE_SIZE 时淘汰最久未用的条目。编码失败（None）
+        不缓存。其余调用直接转发给内层后端。
+        """
+        if not is_query or title is not None:
+            return self._inner.embed(text, is_query=is_query, title=title)
+
+        cached = self._query_cache.get(text)
+        if cached is not None:
+            self._query_cache.move_to_end(text)
+            return cached
+
+        # 编码失败（None）不缓存，下次查询重试
+        result = self._inner.embed(text, is_query=True)
+        if result is not None:
+            self._query_cache[text] = result
+            if len(self._query_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return result
+
+    def embed_batch(
+        self, texts: list[str], titles: list[str | None] | None = None
+    ) -> list[EmbeddingResult | None]:
+        """批量文档编码，不缓存，转发给内层后端。"""
+        return self._inner.embed_batch(texts, titles)
+
+    def rerank(
+        self, query: str, documents: list[RerankDocument], top_n: int | None = None
+    ) -> RerankResult:
+        """转发给内层后端。"""
+        return self._inner.rerank(query, documents, top_n)
+
+    def expand_query(
+        self, query: str, context: str | None = None
+    ) -> list[ExpandedQuery]:
+        """转发给内层后端。"""
+        return self._inner.expand_query(query, context)
+
+    def get_embedding_dimensions(self) -> int:
+        """转发给内层后端。"""
+        return self._inner.get_embedding_dimensions()
+
+    def close(self) -> None:
+        """清空查询缓存并关闭内层后端。"""
+        self._query_cache.clear()
+        self._inner.close()
+
+
 def _match_engineering_type(content: str, engineering_type: str) -> bool:
     """检查内容是否匹配指定工程类型。
 
@@ -3,9 +3,30 @@ from typing import List, Dict, Optional
 from utils.logger_system import log_msg
 
 class MarkdownVerifier:
+    # 内置 LLM 对话性前缀，类加载时合并编译为一个行首交替模式
+    _PREAMBLE_RE = re.compile(
+        r'^\s*(?:'
+        r'好的[，,。！!：:\s]'
+        r'|以下是'
+        r'|当然[，,。！!：:\s]'
+        r'|我已为你'
+        r'|为您清洗'
+        r'|Here is the cleaned'
+        r'|Markdown\s*内容如下'
+        r')',
+        re.MULTILINE
+    )
+    # 只含一个管道符的行（残缺表格行），check_structure 单次扫描定位
+    _BAD_TABLE_ROW_RE = re.compile(r'^[^|\n]*\|[^|\n]*$', re.MULTILINE)
+
     def __init__(self, min_length_ratio: float = 0.5, forbidden_phrases: List[str] | None = None):
         self.min_length_ratio = min_length_ratio
         self.forbidden_phrases = forbidden_phrases or []
+        # 所有禁用短语合并为一个行首交替模式，check_hallucination 只需单次扫描
+        self._forbidden_re = (
+            re.compile(r'^\s*(?:' + '|'.join(map(re.escape, self.forbidden_phrases)) + ')', re.MULTILINE)
+            if self.forbidden_phrases else None
+        )
 
     def verify(self, original_text: str, cleaned_text: str) -> Dict[str, bool]:
         results = {
@@ -33,24 +54,13 @@ class MarkdownVerifier:
 
     def check_hallucination(self, text: str) -> bool:
         """检查是否有 LLM 对话性前缀（只检查行首出现的短语）。"""
-        preamble_patterns = [
-            r'^\s*好的[，,。！!：:\s]',
-            r'^\s*以下是',
-            r'^\s*当然[，,。！!：:\s]',
-            r'^\s*我已为你',
-            r'^\s*为您清洗',
-            r'^\s*Here is the cleaned',
-            r'^\s*Markdown\s*内容如下',
-        ]
-        for pattern in preamble_patterns:
-            match = re.search(pattern, text, re.MULTILINE)
-            if match:
-                matched_line = text[match.start():text.find('\n', match.start())]
-                log_msg("WARNING", f"检测到幻觉短语: '{matched_line.strip()}'")
-                return False
-        for phrase in self.forbidden_phrases:
-            pattern = r'^\s*' + re.escape(phrase)
-            match = re.search(pattern, text, re.MULTILINE)
+        match = self._PREAMBLE_RE.search(text)
+        if match:
+            matched_line = text[match.start():text.find('\n', match.start())]
+            log_msg("WARNING", f"检测到幻觉短语: '{matched_line.strip()}'")
+            return False
+        if self._forbidden_re:
+            match = self._forbidden_re.search(text)
             if match:
                 matched_line = text[match.start():text.find('\n', match.start())]
                 log_msg("WARNING", f"检测到禁用短语: '{matched_line.strip()}'")
@@ -58,10 +68,9 @@ class MarkdownVerifier:
         return True
 
     def check_structure(self, text: str) -> bool:
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            if '|' in line:
-                if line.count('|') < 2:
-                    log_msg("WARNING", f"结构检查失败：第 {i+1} 行表格管道符数量不足")
-                    return False
+        match = self._BAD_TABLE_ROW_RE.search(text)
+        if match:
+            line_no = text.count('\n', 0, match.start()) + 1
+            log_msg("WARNING", f"结构检查失败：第 {line_no} 行表格管道符数量不足")
+            return False
         return True